@@ -2,16 +2,14 @@
 # - Map displays belgium_map_simplified.shp
 # - Clicking a region writes its `nouveau_PO` into the postal_code field (numeric input)
 
-import json
-
 from shiny import App, ui, render, reactive
 from model_price import calculate_price
 
 ####################################################################################
 
+# GeoJSON is valid JavaScript: embed the file text as-is, without parsing it
 with open('./data/belgium_map.geojson', encoding='utf-8') as f:
-    geojson_data_raw = json.load(f)
-    geojson_data = json.dumps(geojson_data_raw)
+    geojson_data = f.read()
 
 app_ui = ui.page_fluid(
 
@@ -290,6 +288,9 @@ ui.tags.div(
     ),
 )
 
+# The text now lives inside app_ui; don't keep a second copy (matters when serve.py forks workers)
+del geojson_data
+
 def collect_data(input):
     return {
         "postal_code": input.postal_code(),
@@ -2,9 +2,14 @@
 # This module contains the logic that calculates the price
 # based on the form data received from Shiny.
 
+import os
+import warnings
+
 import pandas as pd
 from joblib import load
 
+from tree_ensemble import TreeEnsemble
+
 mapping_dataset = "./data/postal_code_mapping.csv"
 df = pd.read_csv(   mapping_dataset, 
                     na_values=["None"],
@@ -12,8 +17,23 @@ df = pd.read_csv(   mapping_dataset,
                     delimiter=","
                  )
 
+# Trees exported by service_scripts/export_trees.py: plain NumPy arrays,
+# memory-mapped, no xgboost / scikit-learn needed. Fallback: the pickle,
+# also when the trees were exported from an older best_model.joblib.
+best_model_trees_path = "./data/best_model_trees"
 best_model_path = "./data/best_model.joblib"
-best_model = load(best_model_path)
+
+best_model = None
+
+if os.path.isdir(best_model_trees_path):
+    best_model = TreeEnsemble.load(best_model_trees_path)
+    if os.path.exists(best_model_path) and not best_model.matches_source(best_model_path):
+        warnings.warn(f"{best_model_trees_path} was not exported from the current {best_model_path}, "
+                      f"using the pickle; re-run service_scripts/export_trees.py")
+        best_model = None
+
+if best_model is None:
+    best_model = load(best_model_path)
 
 def calculate_price(data: dict) -> int:
     """
@@ -0,0 +1,172 @@
+# serve.py — pre-fork multi-worker server for the Shiny app
+# - The master process imports app.py once: this loads the model, the postal
+#   code mapping table and the prepared GeoJSON map string
+# - Everything is frozen with gc.freeze() and then N workers are forked;
+#   workers share those pages copy-on-write and never re-import or reload
+# - Per-worker RSS and USS (unique set size) are printed so the savings
+#   can be verified
+# - Linux only: uses os.fork() and /proc/<pid>/smaps_rollup
+#
+# Usage (from the project root, like app.py):
+#   python serve.py --workers 4 --port 8000
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+####################################################################################
+
+def read_memory(pid: int) -> dict:
+    """
+    Returns RSS, PSS and USS of a process in kB (Linux, /proc/<pid>/smaps_rollup).
+    USS = Private_Clean + Private_Dirty: memory that would be freed if the process exits.
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", encoding="ascii") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3 and parts[-1] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1])
+    except OSError:
+        return {}
+
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def print_memory_report(master_pid: int, worker_pids: list) -> None:
+    print(f"{'role':<8}{'pid':>8}{'RSS, MB':>12}{'PSS, MB':>12}{'USS, MB':>12}", flush=True)
+
+    for role, pid in [("master", master_pid)] + [("worker", p) for p in worker_pids]:
+        mem = read_memory(pid)
+        if not mem:
+            print(f"{role:<8}{pid:>8}{'n/a':>12}{'n/a':>12}{'n/a':>12}", flush=True)
+            continue
+        print(
+            f"{role:<8}{pid:>8}"
+            f"{mem['rss'] / 1024:>12.1f}{mem['pss'] / 1024:>12.1f}{mem['uss'] / 1024:>12.1f}",
+            flush=True,
+        )
+
+####################################################################################
+
+def run_worker(config, sock: socket.socket) -> int:
+    """
+    Runs uvicorn on the inherited socket. Returns: exit status of the worker.
+    """
+    import uvicorn
+
+    # Objects allocated from now on belong to this worker only
+    gc.enable()
+
+    try:
+        # config is already loaded in the master, so Server.serve() skips config.load()
+        uvicorn.Server(config).run(sockets=[sock])
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr, flush=True)
+        return 1
+    except BaseException:
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pre-fork server for the price prediction app")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--report-delay", type=float, default=5.0,
+                        help="seconds after start-up before the memory report is printed")
+    args = parser.parse_args()
+
+    # No collections while the shared state is being built: a collection
+    # would touch object headers and spread them over more pages
+    gc.disable()
+
+    # Load once in the master: model, mapping table, GeoJSON string, UI tree,
+    # and uvicorn's protocol, lifespan and event loop modules
+    import uvicorn
+    from app import app
+
+    # Pick the event loop here: with loop="auto" every worker would retry
+    # a missing uvloop import on its own
+    try:
+        import uvloop  # noqa: F401
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"
+
+    config = uvicorn.Config(app, log_level="warning", loop=loop)
+    config.load()
+    config.get_loop_factory()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # Move every live object to the permanent generation right before the
+    # fork, so that the workers' collectors never write to (and thereby copy)
+    # the shared pages. No gc.collect() here: freeing objects would leave
+    # holes in the shared pages that worker allocations then fill and dirty
+    gc.freeze()
+
+    worker_pids = []
+    for _ in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                status = run_worker(config, sock)
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(status)
+        worker_pids.append(pid)
+
+    print(f"Serving on http://{args.host}:{args.port} with {len(worker_pids)} workers", flush=True)
+
+    def stop(signum, frame):
+        for pid in worker_pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    # Send SIGUSR1 to the master to print the report again
+    signal.signal(signal.SIGUSR1, lambda signum, frame: print_memory_report(os.getpid(), worker_pids))
+
+    time.sleep(args.report_delay)
+    print_memory_report(os.getpid(), worker_pids)
+
+    alive = set(worker_pids)
+    while alive:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        alive.discard(pid)
+        print(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, "
+              f"{len(alive)} workers left", flush=True)
+
+    sock.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+import sys
+import tempfile
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.append("..")
+from tree_ensemble import TreeEnsemble, _export_sklearn, _flatten, source_info
+
+# Hand-built trees, numpy only: no xgboost / scikit-learn / best_model.joblib needed
+
+#######################################
+# XGBoost-style trees: go left if x < split value
+#######################################
+
+# Tree 0 (depth 2):           Tree 1 (depth 1):
+#   0: f0 < 10, NaN -> left     0: f1 < 5, NaN -> right
+#   1: leaf 1                   1: leaf 10
+#   2: f1 < 5, NaN -> right     2: leaf 20
+#   3: leaf 2
+#   4: leaf 3
+tree0 = {
+    "feature":      np.array([0, 0, 1, 0, 0]),
+    "threshold":    np.array([10.0, 0.0, 5.0, 0.0, 0.0]),
+    "left":         np.array([1, -1, 3, -1, -1]),
+    "right":        np.array([2, -1, 4, -1, -1]),
+    "default_left": np.array([True, False, False, False, False]),
+    "value":        np.array([0.0, 1.0, 0.0, 2.0, 3.0]),
+}
+tree1 = {
+    "feature":      np.array([1, 0, 0]),
+    "threshold":    np.array([5.0, 0.0, 0.0]),
+    "left":         np.array([1, -1, -1]),
+    "right":        np.array([2, -1, -1]),
+    "default_left": np.array([False, False, False]),
+    "value":        np.array([0.0, 10.0, 20.0]),
+}
+
+arrays, max_depth = _flatten([tree0, tree1])
+
+assert max_depth == 2
+assert list(arrays["roots"]) == [0, 5]
+# Children are absolute indices; leaves point to themselves
+assert list(arrays["left"]) == [1, 1, 3, 3, 4, 6, 6, 7]
+assert list(arrays["right"]) == [2, 1, 4, 3, 4, 7, 6, 7]
+
+meta = {"feature_names": ["a", "b"], "base_score": 100.0, "link": "identity", "max_depth": max_depth}
+ensemble = TreeEnsemble(arrays, meta)
+
+X = np.array([
+    [9.0, 4.0],         # left in tree 0; left in tree 1                   -> 1 + 10
+    [10.0, 5.0],        # x == split value goes right in both trees        -> 3 + 20
+    [11.0, 4.0],        # right then left in tree 0; tree 1 (depth 1) stays on its leaf -> 2 + 10
+    [np.nan, 6.0],      # NaN -> default left in tree 0                    -> 1 + 20
+    [11.0, np.nan],     # NaN -> default right in both trees               -> 3 + 20
+])
+expected = 100.0 + np.array([11.0, 23.0, 12.0, 21.0, 23.0])
+
+assert np.array_equal(ensemble.predict(X), expected)
+
+# Batches split into chunks give the same result
+assert np.array_equal(ensemble.predict(X, batch_size=2), expected)
+
+# exp link (reg:gamma, reg:tweedie, count:poisson): base score is a margin
+meta_exp = dict(meta, base_score=0.0, link="exp")
+assert np.allclose(TreeEnsemble(arrays, meta_exp).predict(X), np.exp(expected - 100.0))
+
+# apply(): leaf indices numbered within each tree
+assert np.array_equal(ensemble.apply(X), [[1, 1], [4, 2], [3, 1], [1, 2], [4, 2]])
+
+# XGBoost `missing` value: 0 goes the default direction like NaN
+# (f1 == 0 would otherwise go left in both trees: 2 + 10)
+meta_missing = dict(meta, missing=0.0)
+X_zero = np.array([[11.0, 0.0]])
+assert np.array_equal(ensemble.predict(X_zero), [112.0])
+assert np.array_equal(TreeEnsemble(arrays, meta_missing).predict(X_zero), [123.0])
+
+#######################################
+# scikit-learn-style tree: go left if x <= threshold
+#######################################
+
+class DecisionTreeRegressor:
+    # Stand-in with the attributes _export_sklearn() reads from the real class
+    def __init__(self, tree_):
+        self.tree_ = tree_
+
+# 0: f0 <= 2.5, NaN -> right;  1: leaf 1;  2: leaf 2
+sk_tree = SimpleNamespace(
+    n_outputs=1,
+    node_count=3,
+    feature=np.array([0, -2, -2]),
+    threshold=np.array([2.5, -2.0, -2.0]),
+    children_left=np.array([1, -1, -1]),
+    children_right=np.array([2, -1, -1]),
+    missing_go_to_left=np.array([0, 0, 0], dtype=np.uint8),
+    value=np.array([[[0.0]], [[1.0]], [[2.0]]]),
+)
+
+trees, sk_meta = _export_sklearn(DecisionTreeRegressor(sk_tree))
+arrays, sk_meta["max_depth"] = _flatten(trees)
+sk_meta["feature_names"] = ["a"]
+sk_ensemble = TreeEnsemble(arrays, sk_meta)
+
+# "x <= 2.5" is stored as "x < nextafter(2.5, +inf)"
+assert arrays["threshold"][0] == np.nextafter(2.5, np.inf)
+
+below = np.nextafter(np.float32(2.5), np.float32(-np.inf))
+above = np.nextafter(np.float32(2.5), np.float32(np.inf))
+X = np.array([[below], [2.5], [above], [np.nan]], dtype=np.float32)
+
+assert np.array_equal(sk_ensemble.predict(X), [1.0, 1.0, 2.0, 2.0])
+
+#######################################
+# save() / load() with memory-mapped arrays, source check
+#######################################
+
+with tempfile.TemporaryDirectory() as tmp:
+    model_file = f"{tmp}/model.joblib"
+    with open(model_file, "wb") as f:
+        f.write(b"model v1")
+
+    ensemble.source = source_info(model_file)
+    ensemble.missing = 0.0
+    ensemble.save(f"{tmp}/trees")
+
+    loaded = TreeEnsemble.load(f"{tmp}/trees")
+    assert isinstance(loaded.value, np.memmap)
+    assert loaded.missing == 0.0
+    assert np.array_equal(loaded.predict(X=np.array([[9.0, 4.0]])), [111.0])
+    assert loaded.matches_source(model_file)
+
+    # Retrained model: the exported trees are stale
+    with open(model_file, "wb") as f:
+        f.write(b"model v2")
+    assert not loaded.matches_source(model_file)
+
+#######################################
+
+print('Job finished')
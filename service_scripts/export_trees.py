@@ -0,0 +1,120 @@
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import load
+
+sys.path.append("..")
+from tree_ensemble import TreeEnsemble, export_model
+
+BEST_MODEL_PATH = "../data/best_model.joblib"
+TREES_PATH = "../data/best_model_trees"
+
+# Trees are saved here first and moved to TREES_PATH only if the check
+# passes: model_price.py must never pick up trees that don't match the model
+TMP_TREES_PATH = TREES_PATH + ".tmp"
+
+N_ROWS = 20000
+
+#######################################
+
+model = load(BEST_MODEL_PATH)
+
+ensemble = export_model(model, source_path=BEST_MODEL_PATH)
+
+shutil.rmtree(TMP_TREES_PATH, ignore_errors=True)
+ensemble.save(TMP_TREES_PATH)
+
+print(f"Exported {len(ensemble.roots)} trees, {len(ensemble.value)} nodes, "
+      f"max depth {ensemble.max_depth}")
+
+#######################################
+# Check: same predictions as the original model
+#######################################
+
+# No mmap: the files must not stay open, the directory is renamed below
+start = time.perf_counter()
+loaded = TreeEnsemble.load(TMP_TREES_PATH, mmap=False)
+print(f"Load time: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+rng = np.random.default_rng(0)
+n_features = loaded.n_features_in_
+
+# Each feature is sampled uniformly over the range of thresholds the trees
+# actually split it on, widened on both sides so that values below the
+# lowest and above the highest split are covered too
+# (inf thresholds: scikit-learn splits that only separate missing values)
+is_split = (loaded.left != np.arange(len(loaded.left))) & np.isfinite(loaded.threshold)
+split_feature = np.asarray(loaded.feature)[is_split]
+split_threshold = np.asarray(loaded.threshold)[is_split]
+
+X = np.zeros((N_ROWS, n_features), dtype=np.float32)
+for i in range(n_features):
+    thresholds = split_threshold[split_feature == i]
+    if len(thresholds) == 0:
+        X[:, i] = rng.integers(0, 2, size=N_ROWS)
+        continue
+    low, high = thresholds.min(), thresholds.max()
+    margin = max(high - low, abs(low), abs(high), 1.0) * 0.1
+    X[:, i] = rng.uniform(low - margin, high + margin, size=N_ROWS)
+
+    # Some values exactly on a split value, where "<" vs "<=" matters
+    on_split = rng.random(N_ROWS) < 0.05
+    X[on_split, i] = rng.choice(thresholds, size=on_split.sum())
+
+# Missing values, to check the default directions: NaN, and the model's
+# own `missing` value if it has one (XGBoost)
+X_missing = X.copy()
+X_missing[rng.random(X.shape) < 0.05] = np.nan
+if loaded.missing is not None:
+    X_missing[rng.random(X.shape) < 0.05] = loaded.missing
+X_missing = pd.DataFrame(X_missing, columns=list(loaded.feature_names_in_))
+
+try:
+    expected = model.predict(X_missing)
+    X = X_missing
+except ValueError:
+    # e.g. GradientBoostingRegressor doesn't accept missing values at all
+    print("Model does not accept missing values, checking without them")
+    X = pd.DataFrame(X, columns=list(loaded.feature_names_in_))
+    expected = model.predict(X)
+
+start = time.perf_counter()
+actual = loaded.predict(X)
+print(f"Predict time for {N_ROWS} rows: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+# 1) Traversal must be exact: every row ends in the same leaf of every tree
+expected_leaves = np.asarray(model.apply(X)).reshape(len(X), -1)
+n_wrong_leaves = np.sum(expected_leaves != loaded.apply(X))
+print(f"Leaves that differ: {n_wrong_leaves} of {expected_leaves.size}")
+
+# 2) Sum of the leaf values: XGBoost adds them in float32, the evaluator in
+# float64, so the error grows with the number of trees and the leaf size
+# (for prices in euros that is up to about 1 euro)
+if loaded.link == "exp":
+    diff = np.abs(np.log(expected) - np.log(actual))
+else:
+    diff = np.abs(expected - actual)
+
+tolerance = np.finfo(np.float32).eps * (
+    len(loaded.roots) * np.max(np.abs(loaded.value)) + abs(loaded.base_score)
+)
+print(f"Max difference: {diff.max():.3e} (tolerance {tolerance:.3e})")
+
+if n_wrong_leaves or diff.max() > tolerance:
+    # Also remove an older export, so that the pickle is used
+    shutil.rmtree(TMP_TREES_PATH, ignore_errors=True)
+    shutil.rmtree(TREES_PATH, ignore_errors=True)
+    raise SystemExit("Predictions do not match, nothing exported")
+
+shutil.rmtree(TREES_PATH, ignore_errors=True)
+os.replace(TMP_TREES_PATH, TREES_PATH)
+
+print(f"Saved to {TREES_PATH}")
+
+#######################################
+
+print('Job finished')
@@ -0,0 +1,345 @@
+# tree_ensemble.py
+# Self-contained NumPy evaluator for tree ensembles (XGBoost / scikit-learn).
+#
+# export_model() dumps the trees of a trained model into flat arrays:
+#   feature      int32   split feature index per node (0 for leaves)
+#   threshold    float64 split value: go left if x < threshold
+#   left, right  int32   absolute child index (a leaf points to itself)
+#   default_left bool    direction for missing values (NaN)
+#   value        float64 leaf value, already scaled (0 for inner nodes)
+#   roots        int32   index of the root node of every tree
+# plus meta.json (feature names, base score, link function, max depth, the
+# value that marks a missing feature besides NaN (XGBoost's `missing`), and
+# size / sha256 of the model file the trees were exported from).
+# Every array is a plain .npy file, so TreeEnsemble.load() memory-maps them:
+# loading takes milliseconds and the pages are shared between processes.
+#
+# Only numpy is needed at inference time; xgboost / scikit-learn are needed
+# only by export_model().
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+ARRAY_NAMES = ["feature", "threshold", "left", "right", "default_left", "value", "roots"]
+
+META_FILE = "meta.json"
+
+####################################################################################
+
+class TreeEnsemble:
+    """
+    Vectorized evaluator: traverses all trees for a whole batch at once.
+    Mimics the part of the scikit-learn API used by model_price.py
+    (feature_names_in_ and predict).
+    """
+
+    def __init__(self, arrays: dict, meta: dict):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.default_left = arrays["default_left"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+
+        self.feature_names_in_ = np.asarray(meta["feature_names"], dtype=object)
+        self.n_features_in_ = len(meta["feature_names"])
+        self.base_score = float(meta["base_score"])
+        self.link = meta["link"]
+        self.max_depth = int(meta["max_depth"])
+        self.missing = meta.get("missing")
+        self.source = meta.get("source")
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "TreeEnsemble":
+        mmap_mode = "r" if mmap else None
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in ARRAY_NAMES
+        }
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(arrays, meta)
+
+    def save(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+
+        meta = {
+            "feature_names": [str(name) for name in self.feature_names_in_],
+            "base_score": self.base_score,
+            "link": self.link,
+            "max_depth": self.max_depth,
+            "missing": self.missing,
+            "source": self.source,
+        }
+        with open(os.path.join(path, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+    def matches_source(self, path: str) -> bool:
+        """
+        Returns: True if the trees were exported from this very model file.
+        """
+        return self.source is not None and self.source == source_info(path)
+
+    def predict(self, X, batch_size: int = 4096) -> np.ndarray:
+        """
+        X: DataFrame (columns are reordered by feature_names_in_) or 2D array.
+        Returns: 1D array of predictions.
+        """
+        X = self._to_array(X)
+
+        margin = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], batch_size):
+            chunk = X[start:start + batch_size]
+            margin[start:start + len(chunk)] = self.value[self._leaves(chunk)].sum(axis=1)
+        margin += self.base_score
+
+        if self.link == "exp":
+            return np.exp(margin)
+        return margin
+
+    def apply(self, X) -> np.ndarray:
+        """
+        X: DataFrame or 2D array, as in predict().
+        Returns: (n_samples, n_trees) array of leaf indices, numbered within
+        each tree like the apply() of XGBoost / scikit-learn models.
+        """
+        return self._leaves(self._to_array(X)) - self.roots
+
+    def _to_array(self, X) -> np.ndarray:
+        if hasattr(X, "columns"):
+            X = X[list(self.feature_names_in_)]
+
+        # Both libraries compare features as float32
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected X with {self.n_features_in_} columns, got shape {X.shape}")
+
+        # XGBoost treats both NaN and its `missing` value as missing
+        if self.missing is not None:
+            X[X == np.float64(np.float32(self.missing))] = np.nan
+        return X
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        # node[i, t] = current node of sample i in tree t
+        node = np.broadcast_to(self.roots, (X.shape[0], len(self.roots))).copy()
+        rows = np.arange(X.shape[0])[:, None]
+
+        # Leaves point to themselves, so a fixed number of steps is enough
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[node]]
+            go_left = x < self.threshold[node]
+
+            missing = np.isnan(x)
+            if missing.any():
+                go_left = np.where(missing, self.default_left[node], go_left)
+
+            node = np.where(go_left, self.left[node], self.right[node])
+
+        return node
+
+####################################################################################
+
+def source_info(path: str) -> dict:
+    """
+    Returns: size and sha256 of a model file (mtime is not used: it changes on every copy / deploy).
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return {"size": os.path.getsize(path), "sha256": digest.hexdigest()}
+
+
+def export_model(model, source_path: str = None) -> TreeEnsemble:
+    """
+    model: trained XGBRegressor, RandomForestRegressor, ExtraTreesRegressor,
+           GradientBoostingRegressor or DecisionTreeRegressor.
+    source_path: file the model was loaded from, recorded to detect stale exports.
+    Returns: TreeEnsemble with the same predictions.
+    """
+    if hasattr(model, "get_booster"):
+        trees, meta = _export_xgboost(model)
+    else:
+        trees, meta = _export_sklearn(model)
+
+    if hasattr(model, "feature_names_in_"):
+        meta["feature_names"] = [str(name) for name in model.feature_names_in_]
+    else:
+        meta["feature_names"] = [f"f{i}" for i in range(model.n_features_in_)]
+
+    meta["source"] = source_info(source_path) if source_path else None
+
+    arrays, meta["max_depth"] = _flatten(trees)
+    return TreeEnsemble(arrays, meta)
+
+
+def _export_xgboost(model):
+    booster = model.get_booster()
+    learner = json.loads(booster.save_raw(raw_format="json"))["learner"]
+
+    gbm = learner["gradient_booster"]
+    if gbm["name"] != "gbtree":
+        raise ValueError(f"Unsupported XGBoost booster: {gbm['name']}")
+
+    params = learner["learner_model_param"]
+    if int(params.get("num_class", "0")) > 1 or int(params.get("num_target", "1")) > 1:
+        raise ValueError("Only single-output XGBoost models are supported")
+
+    objective = learner["objective"]["name"]
+    # base_score is stored as a string, e.g. "5E-1" or "[5E-1]" (xgboost >= 3)
+    base_score = float(params["base_score"].strip("[]"))
+
+    if objective in ("reg:gamma", "reg:tweedie", "count:poisson"):
+        link = "exp"
+        base_score = float(np.log(base_score))
+    elif objective.startswith("reg:") and objective != "reg:logistic":
+        link = "identity"
+    else:
+        raise ValueError(f"Unsupported XGBoost objective: {objective}")
+
+    trees_json = gbm["model"]["trees"]
+
+    # Same trees as model.predict(): stop at the best iteration if early stopping was used
+    try:
+        best_iteration = model.best_iteration
+    except AttributeError:
+        best_iteration = None
+    if best_iteration is not None:
+        num_parallel_tree = int(gbm["model"]["gbtree_model_param"].get("num_parallel_tree", "1"))
+        trees_json = trees_json[:(best_iteration + 1) * num_parallel_tree]
+
+    trees = []
+    for tree in trees_json:
+        if any(int(t) != 0 for t in tree.get("split_type", [])):
+            raise ValueError("Categorical splits are not supported")
+
+        left = np.asarray(tree["left_children"], dtype=np.int64)
+        is_leaf = left == -1
+        conditions = np.asarray(tree["split_conditions"], dtype=np.float32).astype(np.float64)
+
+        trees.append({
+            "feature": np.asarray(tree["split_indices"], dtype=np.int64),
+            # XGBoost goes left if x < split value (float32)
+            "threshold": conditions,
+            "left": left,
+            "right": np.asarray(tree["right_children"], dtype=np.int64),
+            "default_left": np.asarray(tree["default_left"], dtype=bool),
+            # Leaf values are stored in split_conditions, already scaled by eta
+            "value": np.where(is_leaf, conditions, 0.0),
+        })
+
+    # None: only NaN is missing
+    missing = float(model.get_params().get("missing", np.nan))
+    if np.isnan(missing):
+        missing = None
+
+    return trees, {"base_score": base_score, "link": link, "missing": missing}
+
+
+def _export_sklearn(model):
+    name = type(model).__name__
+
+    if name in ("RandomForestRegressor", "ExtraTreesRegressor"):
+        estimators = list(model.estimators_)
+        scale = 1.0 / len(estimators)
+        base_score = 0.0
+    elif name == "GradientBoostingRegressor":
+        estimators = [est for row in model.estimators_ for est in row]
+        scale = model.learning_rate
+        if model.init_ == "zero":
+            base_score = 0.0
+        elif hasattr(model.init_, "constant_"):
+            base_score = float(np.ravel(model.init_.constant_)[0])
+        else:
+            raise ValueError(f"Unsupported init estimator: {type(model.init_).__name__}")
+    elif name == "DecisionTreeRegressor":
+        estimators = [model]
+        scale = 1.0
+        base_score = 0.0
+    else:
+        raise ValueError(f"Unsupported model type: {name}")
+
+    trees = []
+    for est in estimators:
+        tree = est.tree_
+        if tree.n_outputs != 1:
+            raise ValueError("Only single-output models are supported")
+
+        left = tree.children_left.astype(np.int64)
+        is_leaf = left == -1
+
+        # Older scikit-learn versions don't support missing values at all
+        missing_go_to_left = getattr(tree, "missing_go_to_left", None)
+        if missing_go_to_left is None:
+            missing_go_to_left = np.ones(tree.node_count, dtype=bool)
+
+        trees.append({
+            "feature": tree.feature.astype(np.int64),
+            # scikit-learn goes left if x <= threshold, where x is float32.
+            # No float32 value lies strictly between threshold and the next
+            # float64, so "x <= t" is the same as "x < nextafter(t, +inf)"
+            "threshold": np.nextafter(tree.threshold.astype(np.float64), np.inf),
+            "left": left,
+            "right": tree.children_right.astype(np.int64),
+            "default_left": np.asarray(missing_go_to_left, dtype=bool),
+            "value": np.where(is_leaf, tree.value[:, 0, 0] * scale, 0.0),
+        })
+
+    return trees, {"base_score": base_score, "link": "identity"}
+
+
+def _flatten(trees: list):
+    """
+    Concatenates per-tree node arrays (local child indices, -1 for leaves)
+    into flat arrays with absolute indices. Returns: (arrays, max_depth).
+    """
+    parts = {name: [] for name in ARRAY_NAMES if name != "roots"}
+    roots = []
+    max_depth = 0
+    offset = 0
+
+    for tree in trees:
+        n_nodes = len(tree["left"])
+        is_leaf = tree["left"] == -1
+        own_index = np.arange(n_nodes) + offset
+
+        parts["feature"].append(np.where(is_leaf, 0, tree["feature"]))
+        parts["threshold"].append(np.where(is_leaf, 0.0, tree["threshold"]))
+        parts["left"].append(np.where(is_leaf, own_index, tree["left"] + offset))
+        parts["right"].append(np.where(is_leaf, own_index, tree["right"] + offset))
+        parts["default_left"].append(tree["default_left"])
+        parts["value"].append(tree["value"])
+
+        roots.append(offset)
+        max_depth = max(max_depth, _tree_depth(tree["left"], tree["right"]))
+        offset += n_nodes
+
+    arrays = {
+        "feature": np.concatenate(parts["feature"]).astype(np.int32),
+        "threshold": np.concatenate(parts["threshold"]).astype(np.float64),
+        "left": np.concatenate(parts["left"]).astype(np.int32),
+        "right": np.concatenate(parts["right"]).astype(np.int32),
+        "default_left": np.concatenate(parts["default_left"]).astype(bool),
+        "value": np.concatenate(parts["value"]).astype(np.float64),
+        "roots": np.asarray(roots, dtype=np.int32),
+    }
+    return arrays, max_depth
+
+
+def _tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+    depth = 0
+    stack = [(0, 0)]
+    while stack:
+        node, d = stack.pop()
+        if left[node] == -1:
+            depth = max(depth, d)
+            continue
+        stack.append((int(left[node]), d + 1))
+        stack.append((int(right[node]), d + 1))
+    return depth